@@ -6,19 +6,30 @@ import hashlib
 import html
 import logging
 import os
-import queue
 import re
+import secrets
 import shelve
+import sqlite3
 import subprocess
 import sys
 import threading
+import time
 import datetime as dt
+import dbm
+import functools
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlparse
 
+import orjson
 import requests
-from flask import Flask, redirect, request, url_for
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:  # strip_html falls back to regexes
+    LexborHTMLParser = None
+from flask import Flask, Response, redirect, request, url_for
 
-from my_ld import preprocess_text, compute_lexdiv
+from my_ld import LEX_MODEL, LexdivResult, get_nlp, preprocess_text, compute_lexdiv
 
 # Configure logging
 logging.basicConfig(
@@ -28,62 +39,168 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# my_ld loads spaCy on first use; do it now, with one tiny document, so the first request doesn't wait
+logger.info("Loading and warming up spaCy pipeline")
+preprocess_text("warm")
+# text_cache rows hold one pipeline's results; keying on it keeps a model change from reusing them
+PIPELINE_ID = f"{LEX_MODEL}-{get_nlp().meta['version']}"
+
 CACHE_PATH = os.environ.get("CACHE_PATH", "./data/mtld_cache")
-REFRESH_SECONDS = int(os.environ.get("REFRESH_SECONDS", "10"))
+CACHE_DB = CACHE_PATH + ".sqlite"
+REFRESH_SECONDS = int(os.environ.get("REFRESH_SECONDS", "10"))  # <noscript> fallback only
+EVENTS_RETRY_MS = 2000  # how soon the browser asks /events again; each request answers at once
 POST_LIMIT = 500
-ACCOUNT_DUMPS_DIR = "./account_dumps"
+TEXT_CACHE_ROWS = 10_000  # analyses kept in text_cache; older ones are deleted first
+TEXT_CACHE_MAX_CHARS = 200_000  # longer texts are analyzed but never cached
+LEADERBOARD_ROWS = 200  # rows on the front page
+PAGE_SIZE = 50  # rows per /?page=N page
+WORKERS = int(os.environ.get("WORKERS", os.cpu_count() or 4))  # worker threads, each with its own queue
+FETCH_DEBUG = os.environ.get("FETCH_DEBUG") == "1"  # keep ./account_dumps/<handle>.txt copies
+
+os.makedirs(os.path.dirname(CACHE_DB) or ".", exist_ok=True)
 
 app = Flask(__name__, static_folder="static")
 
 # Job queue and state
-_queue = queue.Queue()
-_jobs = {}  # job_id -> {"status": "queued"|"processing"|"done"|"error", "handle": str, "error": str|None, "position": int}
-_jobs_lock = threading.RLock()  # Use RLock to allow reentrant locking
-_cache_lock = threading.Lock()  # Lock for cache access
+_executors = [ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"worker-{i}") for i in range(WORKERS)]
+_jobs = {}  # job_id -> {"status": "queued"|"processing"|"done"|"error", "handle": str, "worker": int, "seq": int, "error": str|None}
+_enqueued = [0] * WORKERS  # per worker: jobs ever submitted; the next job's "seq"
+_dequeued = [0] * WORKERS  # per worker: jobs ever started, always in seq order
+_active = {}  # handle -> job_id of its queued or processing job
+_jobs_lock = threading.Lock()  # Guards _jobs, _enqueued, _dequeued and _active
+_cache_lock = threading.Lock()  # SQLite allows one writer at a time
+_cache_writes = 0  # bumped on every write_cache, invalidates _rows_cache
+_etag_key = secrets.token_bytes(16)  # per process, so a restart never revalidates an old page
+_rows_cache = (None, None, None)  # (cache_version() it was built at, leaderboard rows, "more" row) as bytes
+
+# One long-lived connection shared by every thread; SQLite runs its statements one at a time.
+# WAL keeps delete_from_cache.py's commits and this process's reads from blocking each other.
+_db = sqlite3.connect(CACHE_DB, check_same_thread=False, isolation_level=None)
+_db.row_factory = sqlite3.Row
+_db.execute("PRAGMA journal_mode=WAL")
+_db.execute("PRAGMA synchronous=NORMAL")
+_db.execute("CREATE TABLE IF NOT EXISTS mtld(handle TEXT PRIMARY KEY, mtld REAL, posts INT, date TEXT, row_html TEXT)")
+_db.execute("CREATE INDEX IF NOT EXISTS idx_mtld ON mtld(mtld DESC)")
+_db.execute(
+    "CREATE TABLE IF NOT EXISTS text_cache(sha256 TEXT PRIMARY KEY, mtld REAL, hdd REAL, "
+    "mattr REAL, maas REAL, ntokens INT, ntypes INT, ttr REAL)"
+)
+
+
+_now_iso_last = (None, "")  # (epoch second, formatted) from the last now_iso() call
 
 
 def now_iso():
-    return dt.datetime.now(dt.UTC).isoformat(timespec="seconds")
+    """UTC time to the second; the formatted string is reused within a second"""
+    global _now_iso_last
+    sec = int(time.time())
+    if sec != _now_iso_last[0]:
+        _now_iso_last = (sec, dt.datetime.fromtimestamp(sec, dt.UTC).isoformat(timespec="seconds"))
+    return _now_iso_last[1]
 
 
-def job_id_for(handle):
-    return hashlib.sha256(f"{handle}:{now_iso()}".encode()).hexdigest()[:12]
+def new_job_id():
+    """Random 12-hex-digit job id not already in _jobs. Caller must hold _jobs_lock."""
+    job_id = secrets.token_hex(6)
+    while job_id in _jobs:
+        job_id = secrets.token_hex(6)
+    return job_id
 
 
-def open_cache():
-    os.makedirs(os.path.dirname(CACHE_PATH) or ".", exist_ok=True)
-    return shelve.open(CACHE_PATH, writeback=False)
+def read_cache(limit=LEADERBOARD_ROWS, offset=0):
+    """Up to limit cached entries, best MTLD first, skipping the first offset"""
+    return _db.execute(
+        "SELECT handle, mtld, posts, date, row_html FROM mtld ORDER BY mtld DESC LIMIT ? OFFSET ?", (limit, offset)
+    ).fetchall()
 
 
-def read_cache():
-    """Thread-safe cache read that returns a dict copy"""
-    with _cache_lock:
-        with open_cache() as cache:
-            return dict(cache)
+def lookup_cache(handle):
+    """The cached entry for handle, or None"""
+    return _db.execute(
+        "SELECT handle, mtld, posts, date, row_html FROM mtld WHERE handle = ?", (handle,)
+    ).fetchone()
 
 
 def write_cache(handle, entry):
-    """Thread-safe cache write"""
+    """Insert or replace one handle's entry, along with its rendered leaderboard row"""
+    global _cache_writes
     with _cache_lock:
-        with open_cache() as cache:
-            cache[handle] = entry
+        _db.execute(
+            "INSERT INTO mtld(handle, mtld, posts, date, row_html) VALUES (:handle, :mtld, :posts, :date, :row_html) "
+            "ON CONFLICT(handle) DO UPDATE SET mtld = excluded.mtld, posts = excluded.posts, date = excluded.date, "
+            "row_html = excluded.row_html",
+            {**entry, "row_html": render_row(entry)},
+        )
+        _cache_writes += 1
+
+
+def cache_version():
+    """Changes whenever the cache does, including commits from delete_from_cache.py"""
+    return _db.execute("PRAGMA data_version").fetchone()[0], _cache_writes
+
+
+def migrate_cache():
+    """One-time import of the legacy shelve cache into SQLite"""
+    if _db.execute("SELECT 1 FROM mtld LIMIT 1").fetchone():
+        return
+    if not dbm.whichdb(CACHE_PATH):
+        return
+    with shelve.open(CACHE_PATH, flag="r") as cache:
+        entries = dict(cache)
+    for handle, entry in entries.items():
+        write_cache(handle, entry)
+    logger.info(f"Migrated {len(entries)} cache entries to {CACHE_DB}")
+
+
+def analyze_text(text, min_tokens=0):
+    """Lexical diversity of text, reusing text_cache when the same pipeline analyzed the same text before"""
+    key = hashlib.sha256(f"{PIPELINE_ID}\0{text}".encode()).hexdigest()
+    row = _db.execute(
+        f"SELECT {', '.join(LexdivResult._fields)} FROM text_cache WHERE sha256 = ?", (key,)
+    ).fetchone()
+    if row:
+        ld_result = LexdivResult(**dict(row))
+        ntokens = ld_result.ntokens
+    else:
+        tokens = preprocess_text(text)
+        ntokens = len(tokens)
+    if ntokens < min_tokens:
+        raise ValueError(f"Too few tokens ({ntokens}) after preprocessing. Need at least {min_tokens}.")
+    if not row:
+        ld_result = compute_lexdiv(tokens)
+        if len(text) <= TEXT_CACHE_MAX_CHARS:
+            with _cache_lock:
+                _db.execute(
+                    "INSERT OR REPLACE INTO text_cache(sha256, mtld, hdd, mattr, maas, ntokens, ntypes, ttr) "
+                    "VALUES (:sha256, :mtld, :hdd, :mattr, :maas, :ntokens, :ntypes, :ttr)",
+                    {"sha256": key, **ld_result._asdict()},
+                )
+                # Every insert takes a new, higher rowid, so the lowest rowids are the oldest entries
+                _db.execute(
+                    "DELETE FROM text_cache WHERE rowid <= (SELECT max(rowid) FROM text_cache) - ?",
+                    (TEXT_CACHE_ROWS,),
+                )
+    return ld_result
 
 
 def fetch_with_bash(handle, limit):
+    """Run fetch_repo.sh and return the extracted post text from its stdout"""
     script = os.path.abspath("fetch_repo.sh")
+    args = ["bash", script, "--debug"] if FETCH_DEBUG else ["bash", script]
     logger.info(f"Executing fetch_repo.sh for {handle}")
     try:
         result = subprocess.run(
-            ["bash", script, handle, str(limit)],
+            args + [handle, str(limit)],
             capture_output=True,
             text=True,
+            encoding="utf-8",
             check=True
         )
         logger.info(f"fetch_repo.sh completed for {handle}")
-        return f"{ACCOUNT_DUMPS_DIR}/{handle}.txt"
+        return result.stdout
     except subprocess.CalledProcessError as e:
-        # Parse error message from the script
-        error_output = (e.stderr + e.stdout).strip()
+        # Parse error message from the script; stdout holds post text, which may itself contain "ERROR:"
+        error_output = e.stderr.strip()
 
         # Look for our custom error messages
         if "ERROR:" in error_output:
@@ -97,87 +214,123 @@ def fetch_with_bash(handle, limit):
         raise ValueError(f"Failed to fetch posts for {handle}")
 
 
+def worker_for(handle):
+    """Index of the worker whose queue handle goes to; stable, so a handle never runs on two workers"""
+    return int.from_bytes(hashlib.blake2s(handle.encode(), digest_size=2).digest()) % WORKERS
+
+
 def get_queue_position(job_id):
-    with _jobs_lock:
-        queued = [jid for jid, j in _jobs.items() if j["status"] == "queued"]
-        if job_id in queued:
-            return queued.index(job_id) + 1
-    return 0
+    """1-based position among jobs waiting for the same worker, 0 if not waiting. Caller must hold _jobs_lock."""
+    job = _jobs[job_id]
+    if job["status"] != "queued":
+        return 0
+    return job["seq"] - _dequeued[job["worker"]] + 1
+
 
+def worker(job_id, handle):
+    """Run one queued job on its worker's _executors thread"""
+    logger.info(f"Processing job {job_id} for handle: {handle}")
 
-def update_positions():
     with _jobs_lock:
-        queued = [jid for jid, j in _jobs.items() if j["status"] == "queued"]
-        for i, jid in enumerate(queued):
-            _jobs[jid]["position"] = i + 1
+        _jobs[job_id]["status"] = "processing"
+        _dequeued[_jobs[job_id]["worker"]] += 1
 
+    try:
+        logger.info(f"Fetching posts for {handle} (limit: {POST_LIMIT})")
+        text = fetch_with_bash(handle, POST_LIMIT)
 
-def worker():
-    logger.info("Worker thread started")
-    while True:
-        job_id, handle = _queue.get()
-        logger.info(f"Processing job {job_id} for handle: {handle}")
+        logger.info(f"Computing lexical diversity for {handle}")
+        mtld = analyze_text(text).mtld
 
-        with _jobs_lock:
-            _jobs[job_id]["status"] = "processing"
-            update_positions()
+        entry = {
+            "handle": handle,
+            "date": now_iso(),
+            "posts": POST_LIMIT,
+            "mtld": mtld,
+        }
+        write_cache(handle, entry)
 
-        try:
-            logger.info(f"Fetching posts for {handle} (limit: {POST_LIMIT})")
-            textfile = fetch_with_bash(handle, POST_LIMIT)
+        with _jobs_lock:
+            _jobs[job_id]["status"] = "done"
+            _active.pop(handle, None)
 
-            logger.info(f"Reading text file: {textfile}")
-            text = open(textfile, "r", encoding="utf-8").read()
+        logger.info(f"Job {job_id} completed successfully. MTLD: {mtld:.1f}")
 
-            logger.info(f"Preprocessing text for {handle}")
-            tokens = preprocess_text(text)
+    except Exception as e:
+        logger.error(f"Job {job_id} failed with error: {e}", exc_info=True)
+        with _jobs_lock:
+            _jobs[job_id]["status"] = "error"
+            _jobs[job_id]["error"] = str(e)
+            _active.pop(handle, None)
+
+
+def render_row(entry, highlight=False):
+    date = entry["date"].split("T")[0]
+    handle = html.escape(entry["handle"])
+    link = f"https://bsky.app/profile/{handle}"
+    hl = " class='highlight'" if highlight else ""
+    return (
+        f"<tr{hl}><td><a href='{link}'>{handle}</a></td>"
+        f"<td>{entry['mtld']:.1f}</td>"
+        f"<td>{entry['posts']}</td>"
+        f"<td>{date}</td></tr>"
+    )
 
-            logger.info(f"Computing lexical diversity for {handle}")
-            mtld = compute_lexdiv(tokens).mtld
 
-            entry = {
-                "handle": handle,
-                "date": now_iso(),
-                "posts": POST_LIMIT,
-                "mtld": mtld,
-            }
-            write_cache(handle, entry)
+_EMPTY_ROWS = b"<tr><td colspan='4' class='empty'>No handles analyzed yet.</td></tr>"
 
-            with _jobs_lock:
-                _jobs[job_id]["status"] = "done"
 
-            logger.info(f"Job {job_id} completed successfully. MTLD: {mtld:.1f}")
+def more_row(page):
+    return f"<tr><td colspan='4' class='empty'><a href='/?page={page}'>More results</a></td></tr>".encode()
 
-        except Exception as e:
-            logger.error(f"Job {job_id} failed with error: {e}", exc_info=True)
-            with _jobs_lock:
-                _jobs[job_id]["status"] = "error"
-                _jobs[job_id]["error"] = str(e)
 
-        _queue.task_done()
+def nav_row(page, more):
+    """Previous and, when more is true, next links under /?page=N"""
+    previous = f"/?page={page - 1}" if page > 1 else "/"
+    links = f"<a href='{previous}'>Previous results</a>"
+    if more:
+        links += f" &middot; <a href='/?page={page + 1}'>More results</a>"
+    return f"<tr><td colspan='4' class='empty'>{links}</td></tr>".encode()
 
 
-# Start single background worker
-_worker_thread = threading.Thread(target=worker, daemon=True)
-_worker_thread.start()
+def build_table_rows(highlight=None):
+    """Front-page leaderboard rows as bytes, rendered from SQLite once per cache change"""
+    global _rows_cache
+    current = cache_version()
+    version, rows, more = _rows_cache
+    if version != current:
+        entries = read_cache(LEADERBOARD_ROWS + 1)
+        if entries:
+            rows = "\n".join(e["row_html"] for e in entries[:LEADERBOARD_ROWS]).encode()
+        else:
+            rows = _EMPTY_ROWS
+        more = b"\n" + more_row(LEADERBOARD_ROWS // PAGE_SIZE + 1) if len(entries) > LEADERBOARD_ROWS else b""
+        _rows_cache = (current, rows, more)
+    entry = lookup_cache(highlight) if highlight else None
+    if entry:
+        plain, marked = entry["row_html"].encode(), render_row(entry, highlight=True).encode()
+        # Below the front page cut-off the highlighted handle is shown after the top rows
+        rows = rows.replace(plain, marked, 1) if plain in rows else rows + b"\n" + marked
+    return rows + more
+
+
+def build_page_rows(page):
+    """One PAGE_SIZE slice of the full leaderboard, for /?page=N"""
+    entries = read_cache(PAGE_SIZE + 1, (page - 1) * PAGE_SIZE)
+    if not entries:
+        last = -(-_db.execute("SELECT count(*) FROM mtld").fetchone()[0] // PAGE_SIZE)
+        if not last:
+            return _EMPTY_ROWS
+        # Past the end: point back at the last page that has rows
+        return (
+            f"<tr><td colspan='4' class='empty'>No more results. "
+            f"<a href='/?page={last}'>Back to page {last}</a></td></tr>"
+        ).encode()
+    rows = "\n".join(e["row_html"] for e in entries[:PAGE_SIZE]).encode()
+    return rows + b"\n" + nav_row(page, more=len(entries) > PAGE_SIZE)
 
 
-def build_table_rows(cache, highlight=None):
-    entries = sorted(cache.values(), key=lambda x: x["mtld"], reverse=True)
-    if not entries:
-        return "<tr><td colspan='4' class='empty'>No handles analyzed yet.</td></tr>"
-    rows = []
-    for e in entries:
-        date = e["date"].split("T")[0]
-        link = f"https://bsky.app/profile/{e['handle']}"
-        hl = " class='highlight'" if e["handle"] == highlight else ""
-        rows.append(
-            f"<tr{hl}><td><a href='{link}'>{e['handle']}</a></td>"
-            f"<td>{e['mtld']:.1f}</td>"
-            f"<td>{e['posts']}</td>"
-            f"<td>{date}</td></tr>"
-        )
-    return "\n".join(rows)
+migrate_cache()
 
 
 HTML_TEMPLATE = """<!doctype html>
@@ -211,50 +364,111 @@ HTML_TEMPLATE = """<!doctype html>
 <tr><th>Handle</th><th>MTLD</th><th>Posts</th><th>Last Pull</th></tr>
 {table_rows}
 </table>
+<script>
+  const status = document.querySelector("#status[data-job]");
+  if (status) {{
+    const events = new EventSource("/events?job=" + status.dataset.job);
+    events.onmessage = (e) => {{
+      const job = JSON.parse(e.data);
+      if (job && (job.status === "queued" || job.status === "processing")) {{
+        status.innerHTML = job.html;
+      }} else {{
+        events.close();
+        location.reload();
+      }}
+    }};
+  }}
+</script>
 <p>MTLD (Measure of Textual Lexical Diversity) estimates vocabulary variety by counting on average how many words you string together before fewer than 72% of them are unique. The metric is relatively stable across passage lengths. Tokens are normalized to their lemma, so run/runs/running are all one verb, while runner is a separate noun. Proper nouns and anything out-of-vocabulary (usernames, misspellings) are skipped and do not affect the score. Lemmatization uses a 600 MB file and is CPU bound, so be patient.</p>
 </body>
 </html>"""
 
+# Static text around the template's three placeholders, split and encoded once at import
+_HTML_HEAD, _HTML_STATUS, _HTML_ROWS, _HTML_TAIL = HTML_TEMPLATE.format(
+    meta_refresh="\0", status_box="\0", table_rows="\0"
+).encode().split(b"\0")
+
+
+def build_status_box(job, pos):
+    """Status box for a job; empty once it is done. Caller must hold _jobs_lock."""
+    handle = html.escape(job["handle"])
+    if job["status"] == "queued":
+        ahead = pos - 1
+        if ahead > 0:
+            return f'<div class="status-box queued">Queued: <strong>{handle}</strong> — {ahead} request{"s" if ahead != 1 else ""} ahead of you</div>'
+        return f'<div class="status-box queued">Queued: <strong>{handle}</strong> — you\'re next</div>'
+    if job["status"] == "processing":
+        return f'<div class="status-box processing">Processing <strong>{handle}</strong>...</div>'
+    if job["status"] == "error":
+        return f'<div class="status-box error">Error processing {handle}: {html.escape(job["error"])}</div>'
+    return ""
+
+
+def job_state(job_id):
+    """Status and rendered status box sent by /events. Caller must hold _jobs_lock."""
+    job = _jobs.get(job_id)
+    if not job:
+        return None
+    return {"status": job["status"], "html": build_status_box(job, get_queue_position(job_id))}
 
-def build_html(cache, job_id=None, highlight=None):
+
+def build_html(job_id=None, highlight=None, page=None):
     meta_refresh = ""
     status_box = ""
 
     if job_id:
         with _jobs_lock:
             job = _jobs.get(job_id)
+            box = build_status_box(job, get_queue_position(job_id)) if job else ""
 
         if job:
-            if job["status"] == "queued":
-                pos = get_queue_position(job_id)
-                meta_refresh = f'<meta http-equiv="refresh" content="{REFRESH_SECONDS}">'
-                ahead = pos - 1
-                if ahead > 0:
-                    status_box = f'<div class="status-box queued">Queued: <strong>{job["handle"]}</strong> — {ahead} request{"s" if ahead != 1 else ""} ahead of you</div>'
-                else:
-                    status_box = f'<div class="status-box queued">Queued: <strong>{job["handle"]}</strong> — you\'re next</div>'
-            elif job["status"] == "processing":
-                meta_refresh = f'<meta http-equiv="refresh" content="{REFRESH_SECONDS}">'
-                status_box = f'<div class="status-box processing">Processing <strong>{job["handle"]}</strong>...</div>'
+            if job["status"] in ("queued", "processing"):
+                # Live updates come from /events; reload only without JavaScript
+                meta_refresh = f'<noscript><meta http-equiv="refresh" content="{REFRESH_SECONDS}"></noscript>'
+                status_box = f'<div id="status" data-job="{job_id}">{box}</div>'
             elif job["status"] == "error":
-                status_box = f'<div class="status-box error">Error processing {job["handle"]}: {job["error"]}</div>'
+                status_box = box
             elif job["status"] == "done":
                 highlight = job["handle"]
 
-    rows = build_table_rows(cache, highlight)
-    return HTML_TEMPLATE.format(
-        meta_refresh=meta_refresh,
-        status_box=status_box,
-        table_rows=rows,
-    )
+    rows = build_page_rows(page) if page else build_table_rows(highlight)
+    return b"".join((_HTML_HEAD, meta_refresh.encode(), _HTML_STATUS, status_box.encode(), _HTML_ROWS, rows, _HTML_TAIL))
+
+
+def page_etag(job_id):
+    """Validator for a / page: changes with the cache and with the job's status box"""
+    with _jobs_lock:
+        state = job_state(job_id) if job_id else None
+    return hashlib.blake2b(orjson.dumps([cache_version(), state]), digest_size=8, key=_etag_key).hexdigest()
 
 
 @app.route("/")
 def index():
     job_id = request.args.get("job")
     hl = request.args.get("hl")
-    cache = read_cache()
-    return build_html(cache, job_id=job_id, highlight=hl)
+    page = request.args.get("page", type=int)
+    etag = page_etag(job_id)
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        response = Response(build_html(job_id=job_id, highlight=hl, page=page if page and page > 0 else None))
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"  # always revalidate, the page changes under the same URL
+    return response
+
+
+@app.route("/events")
+def events():
+    """One server-sent event with a job's status, then close; EventSource reconnects after EVENTS_RETRY_MS"""
+    # Answering at once means a page left open on a long job never holds a request thread
+    job_id = request.args.get("job")
+    with _jobs_lock:
+        state = orjson.dumps(job_state(job_id))
+    event_id = hashlib.blake2b(state, digest_size=8).hexdigest()
+    body = f"retry: {EVENTS_RETRY_MS}\n".encode()
+    if request.headers.get("Last-Event-ID") != event_id:  # unchanged since the last reconnect: no data
+        body += f"id: {event_id}\n".encode() + b"data: " + state + b"\n"
+    return Response(body + b"\n", mimetype="text/event-stream", headers={"Cache-Control": "no-cache"})
 
 
 @app.route("/mtld", methods=["GET"])
@@ -264,28 +478,44 @@ def mtld_route():
 
     logger.info(f"Account requested: {handle}")
 
-    cache = read_cache()
-    if handle in cache:
+    if lookup_cache(handle):
         logger.info(f"Account {handle} found in cache")
-        return redirect(url_for("index", hl=handle))
+        return build_html(highlight=handle)
 
-    job_id = job_id_for(handle)
     with _jobs_lock:
-        _jobs[job_id] = {"status": "queued", "handle": handle, "error": None, "position": _queue.qsize() + 1}
-
-    _queue.put((job_id, handle))
-    logger.info(f"Job {job_id} queued for handle: {handle}")
+        # A handle already in flight shares its job; fetch_repo.sh can't run twice for one handle
+        job_id = _active.get(handle)
+        if job_id is None:
+            job_id = new_job_id()
+            _active[handle] = job_id
+            i = worker_for(handle)
+            _jobs[job_id] = {"status": "queued", "handle": handle, "worker": i, "seq": _enqueued[i], "error": None}
+            _enqueued[i] += 1
+            _executors[i].submit(worker, job_id, handle)
+            logger.info(f"Job {job_id} queued for handle: {handle}")
 
     return redirect(url_for("index", job=job_id))
 
 
 ## Substack analyzer ##
 
+_session = requests.Session()  # keeps substack.com connections alive between requests
+ARTICLE_TTL = 3600  # seconds a fetched article is reused for
+ARTICLE_CACHE_SIZE = 256
+_articles = OrderedDict()  # api_url -> (monotonic fetch time, article), oldest first
+_articles_lock = threading.Lock()
+
+_RE_OPEN = re.compile(r'/pub/([^/]+)/p/([^/]+)')
+_RE_HOME_POST = re.compile(r'/home/post/p-(\d+)')
+_RE_SLUG = re.compile(r'/p/([^/]+)')
+
+
+@functools.lru_cache(maxsize=1024)
 def resolve_substack_post_id(post_id):
     """Follow redirect from substack.com/home/post/p-{id} to get actual article URL."""
     url = f"https://substack.com/home/post/p-{post_id}"
     logger.info(f"Resolving post ID redirect: {url}")
-    resp = requests.head(url, allow_redirects=False, timeout=10)
+    resp = _session.head(url, allow_redirects=False, timeout=10)
     if resp.status_code in (301, 302) and 'Location' in resp.headers:
         return resp.headers['Location']
     raise ValueError(f"Could not resolve post ID {post_id}")
@@ -306,7 +536,7 @@ def parse_substack_url(url):
 
     # Handle open.substack.com/pub/{subdomain}/p/{slug}
     if host == 'open.substack.com':
-        match = re.search(r'/pub/([^/]+)/p/([^/]+)', path)
+        match = _RE_OPEN.search(path)
         if match:
             subdomain = match.group(1)
             slug = match.group(2)
@@ -315,7 +545,7 @@ def parse_substack_url(url):
 
     # Handle substack.com/home/post/p-{post_id} by following redirect
     if host in ('substack.com', 'www.substack.com'):
-        match = re.search(r'/home/post/p-(\d+)', path)
+        match = _RE_HOME_POST.search(path)
         if match:
             redirect_url = resolve_substack_post_id(match.group(1))
             return parse_substack_url(redirect_url)  # Recurse with resolved URL
@@ -329,7 +559,7 @@ def parse_substack_url(url):
         subdomain = host
 
     # Extract slug from path: /p/face-the-ick or /p/face-the-ick/
-    match = re.search(r'/p/([^/]+)', path)
+    match = _RE_SLUG.search(path)
     if not match:
         raise ValueError(f"Could not extract article slug from URL: {url}")
     slug = match.group(1)
@@ -345,24 +575,57 @@ def fetch_substack_article(subdomain, slug, host):
     else:
         api_url = f"https://{host}/api/v1/posts/{slug}"
 
+    now = time.monotonic()
+    with _articles_lock:
+        hit = _articles.get(api_url)
+        if hit and now - hit[0] < ARTICLE_TTL:
+            return hit[1]
+
     logger.info(f"Fetching Substack API: {api_url}")
-    resp = requests.get(api_url, timeout=15)
+    resp = _session.get(api_url, timeout=15)
     resp.raise_for_status()
-    return resp.json()
+    article = orjson.loads(resp.content)
+    with _articles_lock:
+        _articles[api_url] = (now, article)
+        _articles.move_to_end(api_url)
+        while len(_articles) > ARTICLE_CACHE_SIZE:
+            _articles.popitem(last=False)
+    return article
+
+
+_RE_SCRIPT = re.compile(r'<(script|style)[^>]*>.*?</\1>', re.DOTALL | re.IGNORECASE)
+_RE_BLOCK = re.compile(r'<(p|div|br|h[1-6]|li)[^>]*>', re.IGNORECASE)
+_RE_TAG = re.compile(r'<[^>]+>')
+_RE_WS = re.compile(r'\s+')
+
+
+_BLOCK_TAGS = "p, div, br, h1, h2, h3, h4, h5, h6, li"
 
 
 def strip_html(html_text):
     """Convert HTML to plain text."""
+    if LexborHTMLParser is None:
+        return strip_html_re(html_text)
+    tree = LexborHTMLParser(html_text)
+    tree.strip_tags(["script", "style"])
+    # Start block elements on a new line, like the regex version, so words either side stay apart
+    for node in tree.css(_BLOCK_TAGS):
+        node.insert_before("\n")
+    return _RE_WS.sub(' ', tree.text(separator="")).strip()
+
+
+def strip_html_re(html_text):
+    """Convert HTML to plain text with regexes, when selectolax isn't installed."""
     # Remove script/style content
-    text = re.sub(r'<(script|style)[^>]*>.*?</\1>', '', html_text, flags=re.DOTALL | re.IGNORECASE)
+    text = _RE_SCRIPT.sub('', html_text)
     # Replace block elements with newlines
-    text = re.sub(r'<(p|div|br|h[1-6]|li)[^>]*>', '\n', text, flags=re.IGNORECASE)
+    text = _RE_BLOCK.sub('\n', text)
     # Remove remaining tags
-    text = re.sub(r'<[^>]+>', '', text)
+    text = _RE_TAG.sub('', text)
     # Decode HTML entities
     text = html.unescape(text)
     # Collapse whitespace
-    text = re.sub(r'\s+', ' ', text).strip()
+    text = _RE_WS.sub(' ', text).strip()
     return text
 
 
@@ -415,6 +678,11 @@ SUBSTACK_TEMPLATE = """<!doctype html>
 </body>
 </html>"""
 
+# Static text around the template's three placeholders, split and encoded once at import
+_SUBSTACK_HEAD, _SUBSTACK_TEXT, _SUBSTACK_CONTENT, _SUBSTACK_TAIL = SUBSTACK_TEMPLATE.format(
+    url_value="\0", text_value="\0", content="\0"
+).encode().split(b"\0")
+
 
 def bar_html(name, desc, value, low, high, low_label, high_label, invert=False, fmt=".2f"):
     """Generate a bar chart for a measure."""
@@ -524,11 +792,7 @@ def substack_route():
             content = '<div class="error">Please paste some text to analyze.</div>'
         else:
             try:
-                tokens = preprocess_text(text)
-                if len(tokens) < 50:
-                    raise ValueError(f"Too few tokens ({len(tokens)}) after preprocessing. Need at least 50.")
-
-                ld_result = compute_lexdiv(tokens)
+                ld_result = analyze_text(text, min_tokens=50)
                 word_count = len(text.split())
                 content = text_results_html(ld_result, word_count)
 
@@ -553,12 +817,7 @@ def substack_route():
                     raise ValueError("Article has no content")
 
                 plain_text = strip_html(body_html)
-                tokens = preprocess_text(plain_text)
-
-                if len(tokens) < 50:
-                    raise ValueError(f"Too few tokens ({len(tokens)}) after preprocessing. Need at least 50.")
-
-                ld_result = compute_lexdiv(tokens)
+                ld_result = analyze_text(plain_text, min_tokens=50)
                 content = substack_results_html(article, ld_result)
 
             except requests.HTTPError as e:
@@ -569,11 +828,12 @@ def substack_route():
                 logger.exception("Substack analysis failed")
                 content = f'<div class="error">Error: {e}</div>'
 
-    return SUBSTACK_TEMPLATE.format(
-        url_value=html.escape(url),
-        text_value=html.escape(text),
-        content=content
-    )
+    return b"".join((
+        _SUBSTACK_HEAD, html.escape(url).encode(),
+        _SUBSTACK_TEXT, html.escape(text).encode(),
+        _SUBSTACK_CONTENT, content.encode(),
+        _SUBSTACK_TAIL,
+    ))
 
 
 if __name__ == "__main__":
@@ -4,10 +4,11 @@ delete_from_cache.py - Remove a handle from the MTLD cache
 Usage: python3 delete_from_cache.py <handle>
 """
 import os
-import shelve
+import sqlite3
 import sys
 
 CACHE_PATH = os.environ.get("CACHE_PATH", "./data/mtld_cache")
+CACHE_DB = CACHE_PATH + ".sqlite"
 
 def main():
     if len(sys.argv) != 2:
@@ -17,16 +18,16 @@ def main():
     handle = sys.argv[1]
 
     try:
-        with shelve.open(CACHE_PATH) as cache:
-            if handle in cache:
-                entry = cache[handle]
-                del cache[handle]
+        with sqlite3.connect(CACHE_DB) as db:
+            entry = db.execute("SELECT mtld, date FROM mtld WHERE handle = ?", (handle,)).fetchone()
+            if entry:
+                db.execute("DELETE FROM mtld WHERE handle = ?", (handle,))
                 print(f"✓ Deleted {handle} from cache")
-                print(f"  MTLD: {entry['mtld']:.1f}, Date: {entry['date']}")
+                print(f"  MTLD: {entry[0]:.1f}, Date: {entry[1]}")
             else:
                 print(f"✗ Handle '{handle}' not found in cache")
                 print(f"\nAvailable handles:")
-                for h in sorted(cache.keys()):
+                for (h,) in db.execute("SELECT handle FROM mtld ORDER BY handle"):
                     print(f"  - {h}")
                 sys.exit(1)
     except Exception as e:
@@ -1,62 +1,74 @@
 #!/usr/bin/env bash
 set -euo pipefail
 
+# Usage: fetch_repo.sh [--debug] <handle> [limit]
+# Extracted post text is written to stdout; progress and errors go to stderr.
+# --debug also keeps a copy in ./account_dumps/<handle>.txt
+DEBUG=""
+if [ "${1:-}" = "--debug" ]; then
+  DEBUG=1
+  shift
+fi
+
 REPO_NAME="$1"	# e.g. lucent.bsky.social
 LIMIT="${2:-}"	# optional: number of latest posts to keep
 ACCOUNT_DUMPS_DIR="./account_dumps"
 
-echo "[fetch_repo.sh] Starting fetch for $REPO_NAME (limit: ${LIMIT:-all})"
+echo "[fetch_repo.sh] Starting fetch for $REPO_NAME (limit: ${LIMIT:-all})" >&2
+
+# Private working directory: concurrent runs never see each other's CAR or unpacked repo
+WORK_DIR="$(mktemp -d)"
+trap 'rm -rf "$WORK_DIR"' EXIT
 
-echo "[fetch_repo.sh] Exporting repository..."
-if ! goat repo export "$REPO_NAME" 2>&1; then
+# Resolve the DID in the background while the (much slower) export downloads
+RESOLVE_OUT="$WORK_DIR/resolve.json"
+goat resolve "$REPO_NAME" > "$RESOLVE_OUT" 2>&1 &
+RESOLVE_PID=$!
+
+echo "[fetch_repo.sh] Exporting repository..." >&2
+if ! (cd "$WORK_DIR" && goat repo export "$REPO_NAME") >&2; then
   echo "[fetch_repo.sh] ERROR: Username not found: $REPO_NAME" >&2
   exit 1
 fi
 
-LATEST_FILE="$(ls -1t "$REPO_NAME".*.car 2>/dev/null | head -n1)"
-if [ -z "$LATEST_FILE" ]; then
+CAR_FILE="$(ls -1 "$WORK_DIR"/*.car 2>/dev/null | head -n1)"
+if [ -z "$CAR_FILE" ]; then
   echo "[fetch_repo.sh] ERROR: Username not found: $REPO_NAME" >&2
   exit 1
 fi
-echo "[fetch_repo.sh] Unpacking $LATEST_FILE..."
-goat repo unpack "$LATEST_FILE"
+echo "[fetch_repo.sh] Unpacking $(basename "$CAR_FILE")..." >&2
+(cd "$WORK_DIR" && goat repo unpack "$CAR_FILE") >&2
 
-echo "[fetch_repo.sh] Resolving DID..."
-DID_DIR="$(goat resolve "$REPO_NAME" 2>&1 | jq -r .id)"
+echo "[fetch_repo.sh] Resolving DID..." >&2
+wait "$RESOLVE_PID" || true
+DID_DIR="$(jq -r .id < "$RESOLVE_OUT" 2>/dev/null || true)"
 if [ "$DID_DIR" = "null" ] || [ -z "$DID_DIR" ]; then
   echo "[fetch_repo.sh] ERROR: Username not found: $REPO_NAME" >&2
   exit 1
 fi
-echo "[fetch_repo.sh] DID: $DID_DIR"
+echo "[fetch_repo.sh] DID: $DID_DIR" >&2
 
-echo "[fetch_repo.sh] Checking post count..."
-POST_DIR="$DID_DIR/app.bsky.feed.post"
+echo "[fetch_repo.sh] Checking post count..." >&2
+POST_DIR="$WORK_DIR/$DID_DIR/app.bsky.feed.post"
 if [ ! -d "$POST_DIR" ]; then
   echo "[fetch_repo.sh] ERROR: No posts found for $REPO_NAME" >&2
-  rm -r "$DID_DIR" 2>/dev/null || true
-  rm "$REPO_NAME".*.car 2>/dev/null || true
   exit 1
 fi
 
 POST_COUNT=$(find "$POST_DIR" -type f -name "*.json" | wc -l)
-echo "[fetch_repo.sh] Found $POST_COUNT posts"
+echo "[fetch_repo.sh] Found $POST_COUNT posts" >&2
 
 if [ "$POST_COUNT" -lt 50 ]; then
   echo "[fetch_repo.sh] ERROR: Insufficient data: $REPO_NAME has only $POST_COUNT posts (minimum 50 required)" >&2
-  rm -r "$DID_DIR" 2>/dev/null || true
-  rm "$REPO_NAME".*.car 2>/dev/null || true
   exit 1
 fi
 
-echo "[fetch_repo.sh] Extracting posts..."
-if [ -n "$LIMIT" ]; then
-  python3 bluesky-tools/thread_replies.py "$DID_DIR" "$LIMIT" > "$ACCOUNT_DUMPS_DIR/$REPO_NAME.txt"
+echo "[fetch_repo.sh] Extracting posts..." >&2
+if [ -n "$DEBUG" ]; then
+  mkdir -p "$ACCOUNT_DUMPS_DIR"
+  python3 bluesky-tools/thread_replies.py "$WORK_DIR/$DID_DIR" ${LIMIT:+"$LIMIT"} | tee "$ACCOUNT_DUMPS_DIR/$REPO_NAME.txt"
 else
-  python3 bluesky-tools/thread_replies.py "$DID_DIR" > "$ACCOUNT_DUMPS_DIR/$REPO_NAME.txt"
+  python3 bluesky-tools/thread_replies.py "$WORK_DIR/$DID_DIR" ${LIMIT:+"$LIMIT"}
 fi
 
-echo "[fetch_repo.sh] Cleaning up..."
-rm -r "$DID_DIR"
-rm "$REPO_NAME".*.car
-
-echo "[fetch_repo.sh] Complete! Output saved to $ACCOUNT_DUMPS_DIR/$REPO_NAME.txt"
+echo "[fetch_repo.sh] Complete!" >&2
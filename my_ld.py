@@ -3,34 +3,211 @@
 my_ld.py — reusable lexical diversity analyzer
 """
 
-import re, spacy, sys
-from collections import Counter
-from taaled import ld
+import hashlib, itertools, math, os, re, spacy, sys, threading
+import numpy as np
+from collections import Counter, OrderedDict, namedtuple
 from ftfy import fix_text
+from spacy.attrs import ORTH, LEMMA, POS, ENT_TYPE, IS_PUNCT
+try:
+	import re2 as _re_linear	# optional google-re2: linear time on any input
+except ImportError:
+	_re_linear = re
 
 MAX_TOKENS = 1_000_000
+CACHE_SIZE = 64	# preprocessed documents kept in memory
+CHUNK_CHARS = 10_000	# minimum size of each piece handed to nlp.pipe
+LEX_MODEL = os.environ.get("LEX_MODEL", "en_core_web_lg")	# en_core_web_sm loads faster for development
+LEX_DEVICE = os.environ.get("LEX_DEVICE", "cpu")	# "gpu" runs tok2vec/tagger/NER on CUDA when one is usable
 
-nlp = spacy.load("en_core_web_lg")
-nlp.max_length = 10_000_000
+_JUNK = frozenset({"↳",">","+","|","$"})
+_BAD_POS = frozenset({"PROPN","NUM"})
+_BAD_ENT = frozenset({"PERSON","ORG","GPE","CARDINAL"})
+_ATTRS = [ORTH, LEMMA, POS, ENT_TYPE, IS_PUNCT]
+
+# TAALED's defaults: MATTR window, MTLD minimum factor length and TTR cut-off, HD-D sample size
+WINDOW, MIN_FACTOR, TTR_CUT, SAMPLES = 50, 10, 0.72, 42
+
+LexdivResult = namedtuple("LexdivResult", "mtld hdd mattr maas ntokens ntypes ttr")
+
+ON_GPU = False	# set by get_nlp() once spacy.prefer_gpu() succeeds
+BATCH_SIZE = 32	# nlp.pipe batch size; get_nlp() raises it on GPU
+
+_nlp = None	# loaded by get_nlp() on first use
+_strings = _JUNK_IDS = _BAD_POS_IDS = _BAD_ENT_IDS = None	# filled in by get_nlp() from its vocab
+_nlp_lock = threading.Lock()
+
+_SENTENCE_END = re.compile(r"[.!?\n]\s+")
+# backtracking re goes quadratic on text with many unclosed "["; links never span lines, so _clean works line by line
+_MD_LINK = _re_linear.compile(r"\[([^\]\n]+)\]\([^)\n]+\)")
+
+_cache = OrderedDict()	# text digest -> token tuple, least recently used first
+_cache_lock = threading.Lock()
+
+def get_nlp():
+	"""The shared spaCy pipeline, loaded on first call so importing my_ld stays cheap."""
+	global _nlp, _strings, _JUNK_IDS, _BAD_POS_IDS, _BAD_ENT_IDS, ON_GPU, BATCH_SIZE
+	with _nlp_lock:
+		if _nlp is None:
+			# must precede spacy.load; falls back to CPU when cupy or a GPU is missing
+			if LEX_DEVICE == "gpu" and spacy.prefer_gpu():
+				ON_GPU, BATCH_SIZE = True, 128
+			# the parser feeds nothing we read; tok2vec stays because tagger and NER listen to it
+			nlp = spacy.load(LEX_MODEL, disable=["parser"])
+			nlp.max_length = 10_000_000
+			_strings = nlp.vocab.strings
+			_JUNK_IDS = np.array([_strings.add(s) for s in _JUNK], dtype="uint64")
+			_BAD_POS_IDS = np.array([_strings.add(s) for s in _BAD_POS], dtype="uint64")
+			_BAD_ENT_IDS = np.array([_strings.add(s) for s in _BAD_ENT], dtype="uint64")
+			_nlp = nlp
+	return _nlp
+
+def text_digest(text):
+	"""Short fixed-size key for a document, so the cache never holds the text itself."""
+	return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
 
 def preprocess_text(text):
-	text = re.sub(r"\[([^\]]+)\]\([^)]+\)", r"\1", text)
-	text = fix_text(text, normalization="NFKC")
-	doc = nlp(text)
+	"""Lemma_POS tokens for text, memoized on its digest."""
+	key = text_digest(text)
+	with _cache_lock:
+		if key in _cache:
+			_cache.move_to_end(key)
+			return list(_cache[key])
+	kept = _preprocess_text(text)
+	with _cache_lock:
+		_cache[key] = tuple(kept)
+		if len(_cache) > CACHE_SIZE:
+			_cache.popitem(last=False)
+	return kept
+
+def _chunks(pieces):
+	"""Cut text arriving in pieces into chunks of at least CHUNK_CHARS, ending on a sentence or line break.
+	The cuts depend only on the joined text, not on where the pieces split it."""
+	buf, pos = "", CHUNK_CHARS
+	for piece in itertools.chain(pieces, [None]):
+		final = piece is None
+		if not final:
+			buf += piece
+		while len(buf) > CHUNK_CHARS:
+			m = _SENTENCE_END.search(buf, pos)
+			# a break at the very end of buf may still grow with the next piece's whitespace
+			if not m or (m.end() == len(buf) and not final):
+				pos = m.start() if m else max(CHUNK_CHARS, len(buf) - 1)
+				break
+			yield buf[:m.end()]
+			buf, pos = buf[m.end():], CHUNK_CHARS
+	yield buf
+
+def read_chunks(path):
+	"""Yield a UTF-8 file in pieces of at least CHUNK_CHARS, ending on line breaks."""
+	with open(path, encoding="utf-8") as f:
+		piece, size = [], 0
+		for line in f:
+			piece.append(line)
+			size += len(line)
+			if size >= CHUNK_CHARS:
+				yield "".join(piece)
+				piece, size = [], 0
+		if piece:
+			yield "".join(piece)
+
+def _clean(text):
+	"""Strip Markdown links and fix encoding; line by line, so cleaning pieces equals cleaning their join."""
+	text = _MD_LINK.sub(r"\1", text)
+	# ftfy's default "auto" stops unescaping after the first line with a "<", which depends on what came before
+	return fix_text(text, normalization="NFKC", unescape_html=True)
+
+def _preprocess_text(text):
+	return _lemmas(_chunks([_clean(text)]))
+
+def preprocess_text_stream(chunks):
+	"""Lemma_POS tokens for text arriving in pieces that end on line breaks, e.g. from read_chunks; not memoized.
+	Same tokens as preprocess_text on the joined text."""
+	return _lemmas(_chunks(map(_clean, chunks)))
+
+def _lemmas(chunks):
 	kept = []
-	for t in doc:
+	nlp = get_nlp()
+	vectors = nlp.vocab.vectors
+	for doc in nlp.pipe(chunks, batch_size=BATCH_SIZE):
+		orth, lemma, pos, ent, punct = doc.to_array(_ATTRS).T
+		# Token.is_oov is vector membership; test each distinct word once
+		uniq, inverse = np.unique(orth, return_inverse=True)
+		oov = np.fromiter((o not in vectors for o in uniq.tolist()), bool, len(uniq))[inverse]
+		drop = punct.astype(bool) | oov | np.isin(orth, _JUNK_IDS)
+		drop |= np.isin(pos, _BAD_POS_IDS) | np.isin(ent, _BAD_ENT_IDS)
+		room = MAX_TOKENS - len(kept)
+		for l, p in zip(lemma[~drop][:room].tolist(), pos[~drop][:room].tolist()):
+			kept.append(f"{_strings[l]}_{_strings[p]}")
 		if len(kept) >= MAX_TOKENS:
 			break
-		if t.is_punct or t.text in {"↳",">","+","|","$"} or t.is_oov:
-			continue
-		if t.pos_ in {"PROPN","NUM"} or t.ent_type_ in {"PERSON","ORG","GPE","CARDINAL"}:
-			continue
-		kept.append(f"{t.lemma_}_{t.pos_}")
 	return kept
 
+def _mtld_factors(ids, ntypes):
+	"""(length, proportion) of each MTLD factor reading ids in order, as TAALED's MTLDER cuts them."""
+	factors, seen = [], [-1] * ntypes	# seen[id] = start of the factor it last appeared in
+	start = types = 0
+	last = len(ids) - 1
+	for x, i in enumerate(ids):
+		if seen[i] != start:
+			seen[i] = start
+			types += 1
+		length = x + 1 - start
+		if x == last:
+			factors.append((length, (1 - types / length) / (1 - TTR_CUT)))
+		elif types / length < TTR_CUT and length >= MIN_FACTOR:
+			factors.append((length, 1))
+			start, types = x + 1, 0
+	return factors
+
+def _mtld(ids, ntypes):
+	"""Mean factor length over the forward and backward passes; partial factors are scaled up."""
+	ids = ids.tolist()
+	factors = _mtld_factors(ids, ntypes) + _mtld_factors(ids[::-1], ntypes)
+	lengths = [length / prop for length, prop in factors if prop != 0]
+	return sum(lengths) / len(lengths) if lengths else 0
+
+def _hdd(counts, n):
+	"""Sum over types of P(type appears in a random SAMPLES-token draw) / SAMPLES."""
+	if n < SAMPLES:
+		return 0
+	freqs, ntypes = np.unique(counts, return_counts=True)
+	k = np.arange(SAMPLES)
+	# C(n-f, SAMPLES) / C(n, SAMPLES) as a running product, 0 once n-f < SAMPLES
+	absent = np.prod(np.clip((n - freqs[:, None] - k) / (n - k), 0, None), axis=1)
+	return float(((1 - absent) / SAMPLES) @ ntypes)
+
+def _mattr(ids, ntypes):
+	"""Mean TTR over every WINDOW-token window, sliding one token at a time."""
+	n = len(ids)
+	if n < WINDOW + 1:
+		return ntypes / n
+	# previous and next position of the same token, from one stable sort
+	order = np.argsort(ids, kind="stable")
+	same = ids[order[1:]] == ids[order[:-1]]
+	prev = np.full(n, -1)
+	prev[order[1:][same]] = order[:-1][same]
+	nxt = np.full(n, n)
+	nxt[order[:-1][same]] = order[1:][same]
+	# sliding from window s to s+1 drops ids[s] and adds ids[s+WINDOW]
+	s = np.arange(n - WINDOW)
+	added = prev[s + WINDOW] < s + 1
+	dropped = nxt[s] > s + WINDOW - 1
+	distinct = len(np.unique(ids[:WINDOW])) + np.concatenate(([0], np.cumsum(added.astype(int) - dropped)))
+	return float(np.mean(distinct / WINDOW))
+
 def compute_lexdiv(tokens):
-	"""Return the full lexical-diversity suite with our tuned TAALD settings."""
-	return ld.lexdiv(tokens)
+	"""MTLD, HD-D, MATTR, Maas and TTR for tokens, numerically matching TAALED's lexdiv."""
+	n = len(tokens)
+	if not n:
+		raise ValueError("No tokens left after preprocessing")
+	vocab = {}
+	ids = np.array([vocab.setdefault(t, len(vocab)) for t in tokens], dtype=np.intp)
+	ntypes = len(vocab)
+	maas = (math.log10(n) - math.log10(ntypes)) / math.log10(n) ** 2 if n > 1 else 0
+	return LexdivResult(
+		mtld=_mtld(ids, ntypes), hdd=_hdd(np.bincount(ids), n), mattr=_mattr(ids, ntypes),
+		maas=maas, ntokens=n, ntypes=ntypes, ttr=ntypes / n,
+	)
 
 def main():
 	if len(sys.argv) < 2:
@@ -39,12 +216,11 @@ def main():
 	path = sys.argv[1]
 	limit = int(sys.argv[2]) if len(sys.argv) > 2 else None
 
-	text = open(path, "r", encoding="utf-8").read()
-	tokens = preprocess_text(text)
+	tokens = preprocess_text_stream(read_chunks(path))
 	if limit and len(tokens) > limit:
 		tokens = tokens[:limit]
 	lexdiv = compute_lexdiv(tokens)
-	for key, value in lexdiv.__dict__.items():
+	for key, value in lexdiv._asdict().items():
 		print(f"{key}: {value}")
 
 if __name__ == "__main__":
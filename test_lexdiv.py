@@ -0,0 +1,39 @@
+"""
+test_lexdiv.py — compute_lexdiv against golden values from TAALED 0.32's ld.lexdiv
+
+Run with: python -m unittest test_lexdiv
+"""
+
+import math, unittest
+from my_ld import compute_lexdiv
+
+CASES = {
+	# n < 42: HD-D is 0
+	"short": ([f"w{(i * i) % 17}" for i in range(30)],
+		dict(mtld=10.114666666666668, hdd=0.0, mattr=0.3, maas=0.23964517735199242, ntokens=30, ntypes=9, ttr=0.3)),
+	# n <= 50: MATTR falls back to TTR
+	"window": ([f"w{(i * i) % 23}" for i in range(50)],
+		dict(mtld=11.536666666666667, hdd=0.2855864751080821, mattr=0.24, maas=0.21471988801949018, ntokens=50, ntypes=12, ttr=0.24)),
+	# n = 51: the first length with two MATTR windows
+	"window_plus_one": ([f"w{(i * i + 7 * i) % 29}" for i in range(51)],
+		dict(mtld=15.166666666666666, hdd=0.35423769507803116, mattr=0.3, maas=0.18227576076023527, ntokens=51, ntypes=15, ttr=0.29411764705882354)),
+	"single_type": (["a"] * 60,
+		dict(mtld=8.851851851851853, hdd=0.023809523809523808, mattr=0.02, maas=0.5623818557528476, ntokens=60, ntypes=1, ttr=0.016666666666666666)),
+	"long_mixed": ([f"w{(i * i * 31 + i * 7) % 997 % (1 + i % 250)}" for i in range(3000)],
+		dict(mtld=63.17515277777778, hdd=0.8542067275392576, mattr=0.78765842087428, maas=0.09272629304744309, ntokens=3000, ntypes=227, ttr=0.07566666666666666)),
+}
+
+class LexdivTest(unittest.TestCase):
+	def test_matches_taaled(self):
+		for name, (tokens, expected) in CASES.items():
+			result = compute_lexdiv(tokens)._asdict()
+			for field, value in expected.items():
+				with self.subTest(case=name, field=field):
+					self.assertTrue(math.isclose(result[field], value, rel_tol=1e-12, abs_tol=1e-15), f"{result[field]} != {value}")
+
+	def test_empty(self):
+		with self.assertRaises(ValueError):
+			compute_lexdiv([])
+
+if __name__ == "__main__":
+	unittest.main()